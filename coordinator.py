@@ -0,0 +1,41 @@
+import asyncio
+import logging
+
+import pandas as pd
+
+from service import THandler
+from settings import SNAPSHOT_REFRESH_SECONDS, STORAGE
+from snapshot import SnapshotWriter
+from t_api import get_last_prices
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+
+async def publish_prices(handler: THandler, writer: SnapshotWriter) -> int:
+    stocks = await handler.get_data('stocks')
+    futures = await handler.get_data('futures')
+    uids = pd.concat([stocks['uid'], futures['uid']]).drop_duplicates()
+    prices = await get_last_prices(uids)
+    return writer.publish(prices)
+
+
+async def main():
+    """Единственный процесс, который ходит в API за справочниками и ценами.
+
+    Запускается с DEPLOY_MODE=coordinator рядом с воркерами main.py,
+    запущенными с DEPLOY_MODE=worker в том же рабочем каталоге.
+    """
+    handler = THandler(STORAGE)
+    writer = SnapshotWriter()
+    while True:
+        try:
+            version = await publish_prices(handler, writer)
+            logger.info(f'Published price snapshot {version}')
+        except Exception as e:
+            logger.exception(str(e))
+        await asyncio.sleep(SNAPSHOT_REFRESH_SECONDS)
+
+
+if __name__ == '__main__':
+    asyncio.run(main())
@@ -1,3 +1,8 @@
 class ValidationError(Exception):
     """Ошибка при валидации тикера."""
     pass
+
+
+class RateLimitError(Exception):
+    """Пользователь превысил лимит запросов."""
+    pass
@@ -0,0 +1,104 @@
+from collections import OrderedDict
+
+import pandas as pd
+
+RENDER_CACHE_SIZE = 256
+# лимит длины сообщения Telegram
+MESSAGE_LIMIT = 4096
+VIEWS = {
+    'short': (
+        ('ticker', 'ticker'),
+        ('expires', 'expiration_date'),
+        ('days', 'days'),
+        ('div', 'dividend'),
+        ('div%', 'div_percent'),
+    ),
+    'details': (
+        ('ticker', 'ticker'),
+        ('expires', 'expiration_date'),
+        ('days', 'days'),
+        ('tdays', 'trading_days'),
+        ('div', 'dividend'),
+        ('div%', 'div_percent'),
+        ('current', 'current'),
+        ('fair', 'fair'),
+        ('s_m', 'sell_margin'),
+        ('b_m', 'buy_margin'),
+    ),
+    'batch': (
+        ('stock', 'stock_ticker'),
+        ('ticker', 'ticker'),
+        ('expires', 'expiration_date'),
+        ('days', 'days'),
+        ('div', 'dividend'),
+        ('div%', 'div_percent'),
+    ),
+    'index': (
+        ('ticker', 'ticker'),
+        ('index', 'index'),
+        ('expires', 'expiration_date'),
+        ('days', 'days'),
+        ('spot', 'spot'),
+        ('price', 'price'),
+        ('basis', 'basis'),
+        ('fair', 'fair'),
+        ('rate%', 'rate'),
+    ),
+}
+
+_rendered: OrderedDict[tuple, str] = OrderedDict()
+
+
+def _short_date(value) -> str:
+    iso = str(value)[:10]
+    return f'{iso[8:10]}.{iso[5:7]}.{iso[2:4]}'
+
+
+def _format_cells(values, column: str) -> list[str]:
+    if column == 'expiration_date':
+        return [_short_date(v) for v in values]
+    return [_format_number(v) if isinstance(v, float) else str(v) for v in values]
+
+
+def _format_number(value: float) -> str:
+    # to_string выводит пропуски как NaN
+    return 'NaN' if value != value else f'{value:.2f}'
+
+
+def render_table(futures: pd.DataFrame, view: str) -> str:
+    """Таблица фиксированной ширины, колонки выровнены по правому краю."""
+    columns = []
+    for header, column in VIEWS[view]:
+        values = futures[column].to_numpy()
+        cells = _format_cells(values, column)
+        # как в DataFrame.to_string: заголовок числовой колонки с отступом
+        header_width = len(header) + (values.dtype.kind in 'iuf')
+        width = max(header_width, *map(len, cells))
+        cells.insert(0, header)
+        columns.append([cell.rjust(width) for cell in cells])
+    return '\n'.join(' '.join(row) for row in zip(*columns))
+
+
+def cached_table(futures: pd.DataFrame, ticker: str, price_version: int, view: str) -> str:
+    key = (ticker, price_version, view)
+    if key in _rendered:
+        _rendered.move_to_end(key)
+        return _rendered[key]
+    table = _rendered[key] = render_table(futures, view)
+    if len(_rendered) > RENDER_CACHE_SIZE:
+        _rendered.popitem(last=False)
+    return table
+
+
+def split_table(table: str, limit: int) -> list[str]:
+    """Режет таблицу по строкам на части не длиннее limit, с заголовком в каждой."""
+    header, *rows = table.split('\n')
+    chunks, current, size = [], [header], len(header)
+    for row in rows:
+        if len(current) > 1 and size + 1 + len(row) > limit:
+            chunks.append('\n'.join(current))
+            current, size = [header], len(header)
+        current.append(row)
+        size += 1 + len(row)
+    chunks.append('\n'.join(current))
+    return chunks
@@ -0,0 +1,81 @@
+import asyncio
+import time
+
+import numpy as np
+import pandas as pd
+
+from exceptions import ValidationError
+from pricing import fair_price, implied_rate
+from service import DISCOUNT_RATE, THandler, fetch_last_prices
+from settings import INDEX_CACHE_SECONDS, INDEX_TICKERS, MARKET_RATE_INDEX, STORAGE
+from trading_calendar import moex_calendar
+
+
+class IndexCounter:
+    """Базис, справедливая цена и подразумеваемая ставка фьючерсов на индексы."""
+
+    # (момент расчёта, результат), общий для всех запросов процесса
+    _cached: tuple[float, pd.DataFrame] | None = None
+    # идущий пересчёт, к нему присоединяются запросы с устаревшим кэшем
+    _refresh: asyncio.Task | None = None
+
+    def __init__(self, storage=STORAGE) -> None:
+        self._handler = THandler(storage)
+
+    async def run(self) -> tuple[float, pd.DataFrame]:
+        """Результат и его версия (момент расчёта) из одного и того же кэша."""
+        cached = IndexCounter._cached
+        if cached is not None and time.monotonic() - cached[0] < INDEX_CACHE_SECONDS:
+            return cached
+        if IndexCounter._refresh is None:
+            IndexCounter._refresh = asyncio.create_task(self._refresh_cache())
+        return await asyncio.shield(IndexCounter._refresh)
+
+    async def market_rate(self) -> float | None:
+        """Подразумеваемая ставка ближайшего фьючерса на MARKET_RATE_INDEX."""
+        _, result = await self.run()
+        futures = result[(result['index'] == MARKET_RATE_INDEX) & np.isfinite(result['rate'])]
+        if futures.empty:
+            return None
+        return float(futures.sort_values(by='days').iloc[0]['rate'])
+
+    async def _refresh_cache(self) -> tuple[float, pd.DataFrame]:
+        try:
+            IndexCounter._cached = (time.monotonic(), await self._count())
+            return IndexCounter._cached
+        finally:
+            IndexCounter._refresh = None
+
+    async def _count(self) -> pd.DataFrame:
+        stocks = await self._handler.get_data('stocks')
+        futures = await self._handler.get_data('futures')
+        # у индикативов нет position_uid, поэтому фьючерсы сопоставляются
+        # индексам по тикеру базового актива
+        indexes = stocks[stocks['ticker'].isin(INDEX_TICKERS)][['ticker', 'uid']]
+        index_futures = futures[futures['basic_asset'].isin(INDEX_TICKERS)].merge(
+            indexes,
+            left_on='basic_asset',
+            right_on='ticker',
+            suffixes=('', '_index'),
+        ).sort_values(by=['ticker_index', 'expiration_date'])
+        if index_futures.empty:
+            raise ValidationError('Нет фьючерсов на индексы')
+
+        prices = await fetch_last_prices(pd.concat([indexes['uid'], index_futures['uid']]))
+        price_map = {p.uid: float(p.price) for p in prices}
+        spot = index_futures['uid_index'].map(price_map).to_numpy(dtype=float)
+        price = index_futures['uid'].map(price_map).to_numpy(dtype=float)
+        sizes = index_futures['basic_asset_size'].to_numpy(dtype=float)
+        days = moex_calendar.days_to(index_futures['expiration_date'])
+        spot_value = spot * sizes
+        return pd.DataFrame({
+            'ticker': index_futures['ticker'].to_numpy(),
+            'index': index_futures['ticker_index'].to_numpy(),
+            'expiration_date': index_futures['expiration_date'].to_numpy(),
+            'days': days,
+            'spot': spot,
+            'price': price,
+            'basis': price - spot_value,
+            'fair': fair_price(spot, sizes, days, DISCOUNT_RATE),
+            'rate': implied_rate(spot, price, sizes, days),
+        })
@@ -1,31 +1,64 @@
 from aiogram import Bot, Dispatcher, F
-from aiogram.types import FSInputFile
+from aiogram.types import BufferedInputFile
 from aiogram.filters import Command
 from aiogram.types import Message
+from aiogram.webhook.aiohttp_server import SimpleRequestHandler, setup_application
+from aiohttp import web
 import openpyxl
 from openpyxl.styles import Border, Side
 from settings import STORAGE
 from users import IsAdmin, UserHandler, IsApproved
-from service import DividendCounter, DISCOUNT_RATE, IndexCounter
-from zoneinfo import ZoneInfo
+from service import DividendCounter, DISCOUNT_RATE
+from index_futures import IndexCounter
+from formatting import MESSAGE_LIMIT, cached_table, split_table
+from scheduler import CommandScheduler
+from trading_calendar import MOSCOW_TZ
+from exceptions import RateLimitError
 from datetime import datetime
-from settings import TG_BOT_TOKEN, TG_ADMIN_IDS
-import pandas as pd
+from settings import BATCH_MAX_TICKERS, TG_BOT_TOKEN, TG_ADMIN_IDS
+from settings import (
+    DEPLOY_MODE,
+    WEBHOOK_HOST,
+    WEBHOOK_PATH,
+    WEBHOOK_PORT,
+    WEBHOOK_SECRET,
+    WEBHOOK_URL,
+)
+import asyncio
+import io
 import logging
+import re
 
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 bot = Bot(TG_BOT_TOKEN)
 dp = Dispatcher()
 user_handler = UserHandler(STORAGE)
-moscow_tz = ZoneInfo('Europe/Moscow')
-pd.options.display.float_format = '{:.2f}'.format
+scheduler = CommandScheduler()
 
 
 def parse_command(cmd: str) -> str:
     return cmd.split()[-1]
 
 
+def parse_tickers(text: str) -> list[str]:
+    return [t for t in re.split(r'[\s,]+', text) if t]
+
+
+async def market_rate_note() -> str:
+    # ставка из кэша IndexCounter, её сбой не должен ломать ответ по тикеру
+    try:
+        rate = await IndexCounter().market_rate()
+    except Exception as e:
+        logger.warning(f'Market rate is unavailable: {e}')
+        return ''
+    return f', market rate = {rate:.2f}' if rate is not None else ''
+
+
+async def notify_queued(message: Message, position: int) -> None:
+    await message.answer(f'Запрос поставлен в очередь, перед вами: {position}')
+
+
 @dp.message(IsAdmin() and Command(commands='approve'))
 async def approve_user(message: Message):
     id_ = int(parse_command(message.text))
@@ -58,11 +91,17 @@ async def process_ticker_list(message: Message):
 
 @dp.message(IsApproved(), Command(commands='d'))
 async def process_details(message: Message):
+    try:
+        scheduler.admit(message.from_user.id, 'details')
+    except RateLimitError as e:
+        await message.answer(str(e))
+        return
     ticker = parse_command(message.text)
-    moscow_time = datetime.now(moscow_tz)
+    moscow_time = datetime.now(MOSCOW_TZ)
     formatted_time = moscow_time.strftime('%H:%M:%S %d-%m-%y')
-    futures, stock = await DividendCounter(STORAGE, ticker).count()
-    df_string = format_details_message(futures)
+    counter = DividendCounter(STORAGE, ticker)
+    futures, stock = await counter.count()
+    df_string = cached_table(futures, stock.iloc[0].ticker, counter.price_version, 'details')
     await message.reply(
         f"Futures for {stock.iloc[0].ticker} ({formatted_time}):\n"
         f"<pre>{df_string}</pre>",
@@ -72,18 +111,48 @@ async def process_details(message: Message):
 
 @dp.message(IsApproved(), F.text.lower() == 'ind')
 async def process_index(message: Message):
-    result = await IndexCounter().run()
-    await message.reply(
-        f'Current index futures {result}'
-    )
+    try:
+        scheduler.admit(message.from_user.id, 'index')
+        # IndexCounter сам кэширует результат и объединяет пересчёты,
+        # в общий с /all слот ind не ставится
+        version, result = await IndexCounter().run()
+        formatted_time = datetime.now(MOSCOW_TZ).strftime('%H:%M:%S %d-%m-%y')
+        df_string = cached_table(result, 'INDEX', version, 'index')
+        await message.reply(
+            f"Index futures ({formatted_time}), discount rate = {DISCOUNT_RATE}:\n"
+            f"<pre>{df_string}</pre>",
+            parse_mode='HTML'
+        )
+
+    except Exception as e:
+        await message.answer(str(e))
 
 
 @dp.message(IsApproved(), Command(commands='all'))
 async def process_full_list(message: Message):
-    filename = await DividendCounter(STORAGE).count_all()
-    
+    try:
+        scheduler.admit(message.from_user.id, 'all')
+    except RateLimitError as e:
+        await message.answer(str(e))
+        return
+    report = await scheduler.run_heavy(
+        'all', build_full_report, lambda p: notify_queued(message, p)
+    )
+
+    # Send the new file to the user
+    result = BufferedInputFile(report, filename='final_report.xlsx')
+    await message.answer_document(result)
+
+
+async def build_full_report() -> bytes:
+    report = await DividendCounter(STORAGE).count_all()
+    # openpyxl синхронный, в потоке он не задерживает остальные ответы
+    return await asyncio.to_thread(decorate_full_report, report)
+
+
+def decorate_full_report(report: io.BytesIO) -> bytes:
     # Load the existing workbook
-    existing_wb = openpyxl.load_workbook(filename)
+    existing_wb = openpyxl.load_workbook(report)
     existing_ws = existing_wb.active
     
     # Create a new workbook for the final output
@@ -92,7 +161,7 @@ async def process_full_list(message: Message):
     
     # Add meta information
     meta_info = [
-        f"Репорт по дивам {datetime.now(moscow_tz).strftime('%d-%m-%Y %H:%M:%S')}",
+        f"Репорт по дивам {datetime.now(MOSCOW_TZ).strftime('%d-%m-%Y %H:%M:%S')}",
         f'Ставка: {DISCOUNT_RATE}% годовых'
     ]
     
@@ -127,24 +196,33 @@ async def process_full_list(message: Message):
 
             current_ticker = ticker
 
-    # Save the new workbook
-    new_filename = 'final_report.xlsx'
-    new_wb.save(new_filename)
-
-    # Send the new file to the user
-    result = FSInputFile(new_filename)
-    await message.answer_document(result)
+    # Save the new workbook in memory: workers share one working directory
+    final_report = io.BytesIO()
+    new_wb.save(final_report)
+    return final_report.getvalue()
 
 
 @dp.message(IsApproved())
 async def process_other_answers(message: Message):
-    moscow_time = datetime.now(moscow_tz)
+    moscow_time = datetime.now(MOSCOW_TZ)
     formatted_time = moscow_time.strftime('%H:%M:%S %d-%m-%y')
+    # у стикеров и фото нет текста
+    tickers = parse_tickers(message.text or '')
+    if not tickers:
+        await message.answer('Отправьте тикер или несколько тикеров через пробел или запятую')
+        return
+    if len(tickers) > 1:
+        await process_batch(message, tickers, formatted_time)
+        return
     try:
-        futures, stock = await DividendCounter(STORAGE, message.text).count()
-        df_string = format_message(futures)
+        scheduler.admit(message.from_user.id, 'lookup')
+        counter = DividendCounter(STORAGE, tickers[0])
+        futures, stock = await counter.count()
+        df_string = cached_table(futures, stock.iloc[0].ticker, counter.price_version, 'short')
+        rate_note = await market_rate_note()
         await message.reply(
-            f"Futures for {stock.iloc[0].ticker} ({formatted_time}), discount rate = {DISCOUNT_RATE}:\n"
+            f"Futures for {stock.iloc[0].ticker} ({formatted_time}), "
+            f"discount rate = {DISCOUNT_RATE}{rate_note}:\n"
             f"<pre>{df_string}</pre>",
             parse_mode='HTML'
         )
@@ -153,47 +231,58 @@ async def process_other_answers(message: Message):
         await message.answer(str(e))
 
 
-def format_message(futures):
-    short_columns = {
-            'expiration_date': 'expires',
-            'div_percent': 'div%',
-            'dividend': 'div'
-        }
-    futures = futures.rename(columns=short_columns)
-    futures['div'] = futures['div'].round(2)
-    futures['div%'] = futures['div%'].round(2)
-    futures['expires'] = pd.to_datetime(futures['expires'])
-    futures['expires'] = futures['expires'].dt.strftime('%d.%m.%y')
-    df_string = futures[
-            ['ticker', 'expires', 'days', 'div', 'div%']
-        ].to_string(index=False)
-
-    return df_string
-
-
-def format_details_message(futures):
-    short_columns = {
-            'expiration_date': 'expires',
-            'div_percent': 'div%',
-            'dividend': 'div',
-            'sell_margin': 's_m',
-            'buy_margin': 'b_m'
-        }
-    futures = futures.rename(columns=short_columns)
-    futures['div'] = futures['div'].round(2)
-    futures['div%'] = futures['div%'].round(2)
-    futures['expires'] = pd.to_datetime(futures['expires'])
-    futures['expires'] = futures['expires'].dt.strftime('%d.%m.%y')
-    futures['fair'] = futures['fair'].round(2)
-    futures['current'] = futures['current'].round(2)
-    df_string = futures[
-            ['ticker', 'expires', 'days', 'div', 'div%', 'current', 'fair', 's_m', 'b_m']
-        ].to_string(index=False)
-
-    return df_string
+
+async def process_batch(message: Message, tickers: list[str], formatted_time: str):
+    if len(tickers) > BATCH_MAX_TICKERS:
+        await message.answer(f'Не больше {BATCH_MAX_TICKERS} тикеров за раз')
+        return
+    try:
+        scheduler.admit(message.from_user.id, 'batch')
+        counter = DividendCounter(STORAGE)
+        futures, missing = await counter.count_batch(tickers)
+        key = ','.join(sorted(set(futures['stock_ticker'])))
+        df_string = cached_table(futures, key, counter.price_version, 'batch')
+        not_found = f"\nНет фьючерсов: {', '.join(missing)}" if missing else ''
+        rate_note = await market_rate_note()
+        caption = f"Futures ({formatted_time}), discount rate = {DISCOUNT_RATE}{rate_note}:\n"
+        budget = MESSAGE_LIMIT - len(caption) - len('<pre></pre>') - len(not_found)
+        chunks = split_table(df_string, budget)
+        for i, chunk in enumerate(chunks):
+            await message.reply(
+                f"{caption if i == 0 else ''}<pre>{chunk}</pre>"
+                f"{not_found if i == len(chunks) - 1 else ''}",
+                parse_mode='HTML'
+            )
+
+    except Exception as e:
+        await message.answer(str(e))
+
+
+async def set_webhook(bot: Bot) -> None:
+    # одинаковый вызов из каждого воркера идемпотентен
+    await bot.set_webhook(WEBHOOK_URL, secret_token=WEBHOOK_SECRET or None)
+
+
+def run_webhook() -> None:
+    """Воркер за балансировщиком: Telegram не отдаёт getUpdates нескольким процессам."""
+    if not WEBHOOK_URL:
+        # set_webhook('') молча удалил бы вебхук
+        raise RuntimeError('В режиме worker нужен WEBHOOK_URL')
+    app = web.Application()
+    SimpleRequestHandler(
+        dispatcher=dp, bot=bot, secret_token=WEBHOOK_SECRET or None
+    ).register(app, path=WEBHOOK_PATH)
+    dp.startup.register(set_webhook)
+    setup_application(app, dp, bot=bot)
+    # reuse_port позволяет нескольким воркерам на одном хосте слушать один порт
+    web.run_app(app, host=WEBHOOK_HOST, port=WEBHOOK_PORT, reuse_port=True)
+
 
 if __name__ == '__main__':
     try:
-        dp.run_polling(bot)
+        if DEPLOY_MODE == 'worker':
+            run_webhook()
+        else:
+            dp.run_polling(bot)
     except Exception as e:
         logger.exception(str(e.__traceback__))
@@ -0,0 +1,24 @@
+import numpy as np
+
+DIVIDEND_TAX_FACTOR = 0.87
+
+
+def growth_factor(days, rate) -> np.ndarray:
+    """Рост за days дней при ежедневном начислении годовой ставки rate%."""
+    return (1 + np.asarray(rate, dtype=float) / 365 / 100) ** np.asarray(days, dtype=float)
+
+
+def fair_price(spot, size, days, rate) -> np.ndarray:
+    return np.asarray(spot, dtype=float) * size * growth_factor(days, rate)
+
+
+def implied_dividend(spot, future_price, size, days, rate) -> np.ndarray:
+    """Дивиденд до налога, заложенный в цену фьючерса."""
+    present_value = np.asarray(future_price, dtype=float) / growth_factor(days, rate)
+    return (np.asarray(spot, dtype=float) - present_value / size) / DIVIDEND_TAX_FACTOR
+
+
+def implied_rate(spot, future_price, size, days) -> np.ndarray:
+    """Годовая ставка в процентах, при которой цена фьючерса справедлива."""
+    ratio = np.asarray(future_price, dtype=float) / (np.asarray(spot, dtype=float) * size)
+    return (ratio ** (1 / np.asarray(days, dtype=float)) - 1) * 365 * 100
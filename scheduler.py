@@ -0,0 +1,113 @@
+import asyncio
+import time
+from typing import Awaitable, Callable
+
+from exceptions import RateLimitError
+from settings import (
+    BUCKET_SWEEP_SECONDS,
+    COMMAND_COSTS,
+    GLOBAL_BUCKET_CAPACITY,
+    GLOBAL_BUCKET_REFILL,
+    HEAVY_COMMAND_SLOTS,
+    USER_BUCKET_CAPACITY,
+    USER_BUCKET_REFILL,
+)
+
+
+class TokenBucket:
+    def __init__(self, capacity: float, refill_rate: float) -> None:
+        self._capacity = capacity
+        self._refill_rate = refill_rate
+        self._tokens = capacity
+        self._updated = time.monotonic()
+
+    def _refill(self) -> None:
+        now = time.monotonic()
+        self._tokens = min(
+            self._capacity,
+            self._tokens + (now - self._updated) * self._refill_rate
+        )
+        self._updated = now
+
+    def wait_time(self, cost: float) -> float:
+        """Сколько секунд ждать, пока в ведре наберётся cost токенов."""
+        self._refill()
+        if self._tokens >= cost:
+            return 0
+        return (cost - self._tokens) / self._refill_rate
+
+    def is_full(self) -> bool:
+        self._refill()
+        return self._tokens >= self._capacity
+
+    def take(self, cost: float) -> None:
+        self._refill()
+        self._tokens -= cost
+
+
+class CommandScheduler:
+    """Лимиты по пользователям и общий лимит с учётом стоимости команд.
+
+    Тяжёлые команды выполняются в ограниченном числе слотов, одинаковые
+    запросы, пришедшие во время выполнения, получают общий результат.
+    """
+
+    def __init__(self) -> None:
+        self._user_buckets: dict[int, TokenBucket] = {}
+        self._global_bucket = TokenBucket(GLOBAL_BUCKET_CAPACITY, GLOBAL_BUCKET_REFILL)
+        self._heavy_slots = asyncio.Semaphore(HEAVY_COMMAND_SLOTS)
+        # запросы, ждущие результата тяжёлых команд, включая присоединившихся
+        self._heavy_waiters = 0
+        self._inflight: dict[str, asyncio.Task] = {}
+        self._last_sweep = time.monotonic()
+
+    def admit(self, user_id: int, command: str) -> None:
+        # присоединение к уже идущему запросу стоит как обычный поиск
+        cost = COMMAND_COSTS['lookup' if command in self._inflight else command]
+        user_bucket = self._user_buckets.setdefault(
+            user_id, TokenBucket(USER_BUCKET_CAPACITY, USER_BUCKET_REFILL)
+        )
+        wait = max(user_bucket.wait_time(cost), self._global_bucket.wait_time(cost))
+        if wait > 0:
+            raise RateLimitError(
+                f'Слишком много запросов, попробуйте через {int(wait) + 1} с'
+            )
+        user_bucket.take(cost)
+        self._global_bucket.take(cost)
+        self._evict_idle_buckets()
+
+    def _evict_idle_buckets(self) -> None:
+        # полное ведро ничем не отличается от нового, его можно забыть
+        now = time.monotonic()
+        if now - self._last_sweep < BUCKET_SWEEP_SECONDS:
+            return
+        self._last_sweep = now
+        self._user_buckets = {
+            user_id: bucket
+            for user_id, bucket in self._user_buckets.items()
+            if not bucket.is_full()
+        }
+
+    async def run_heavy(
+        self,
+        command: str,
+        job: Callable[[], Awaitable],
+        on_queued: Callable[[int], Awaitable] | None = None,
+    ):
+        ahead = self._heavy_waiters
+        self._heavy_waiters += 1
+        try:
+            task = self._inflight.get(command)
+            if task is None:
+                task = self._inflight[command] = asyncio.create_task(self._run_in_slot(job))
+                task.add_done_callback(lambda _: self._inflight.pop(command, None))
+                # присоединившийся к идущему запросу ни за кем не стоит
+                if on_queued is not None and ahead > 0:
+                    await on_queued(ahead)
+            return await asyncio.shield(task)
+        finally:
+            self._heavy_waiters -= 1
+
+    async def _run_in_slot(self, job: Callable[[], Awaitable]):
+        async with self._heavy_slots:
+            return await job()
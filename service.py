@@ -1,23 +1,24 @@
 import asyncio
-import datetime
-from decimal import Decimal
+import io
 from typing import Literal
 
 import pandas as pd
-from tinkoff.invest.schemas import RealExchange, MoneyValue, Quotation
+from tinkoff.invest.schemas import RealExchange, MoneyValue
 from tinkoff.invest.utils import quotation_to_decimal
 
 from exceptions import ValidationError
-from settings import DEFAULT_DISCOUNT_RATE, FUTURES_KEEP_COLUMNS, STOCKS_KEEP_COLUMNS
-from settings import STORAGE
+from pricing import fair_price, implied_dividend
+from settings import DEFAULT_DISCOUNT_RATE, FUTURES_KEEP_COLUMNS, INDEX_TICKERS, STOCKS_KEEP_COLUMNS
+from settings import DEPLOY_MODE, STORAGE
+from snapshot import get_snapshot_prices
 from t_api import (
     fetch_futures,
     fetch_stocks,
     get_last_prices,
     get_orderbook_price,
     is_trading_now,
-    get_index_futures,
 )
+from trading_calendar import MOSCOW_TZ, moex_calendar
 
 FORCE_LAST_PRICE = True
 DISCOUNT_RATE = DEFAULT_DISCOUNT_RATE
@@ -26,24 +27,41 @@ DATA_FETCHERS = {
     'futures': fetch_futures,
     'stocks': fetch_stocks,
 }
+PRICE_FETCHERS = {
+    'standalone': get_last_prices,
+    'coordinator': get_last_prices,
+    'worker': get_snapshot_prices,
+}
+fetch_last_prices = PRICE_FETCHERS[DEPLOY_MODE]
 
 
 class THandler:
+    # распарсенные таблицы инструментов, общие для всех запросов процесса
+    _cache: dict[str, tuple[int, pd.DataFrame]] = {}
+
     def __init__(self, storage) -> None:
         self._storage = storage
 
     async def get_data(self, dt: Literal['futures', 'stocks']) -> pd.DataFrame:
         data_storage = self._storage(dt)
-        await self.update_data(dt, data_storage)
-        return data_storage.retrieve_df()
+        if DEPLOY_MODE != 'worker':
+            # в воркерах справочники обновляет только координатор
+            await self.update_data(dt, data_storage)
+        version = data_storage.version()
+        cached = self._cache.get(dt)
+        if cached is None or cached[0] != version:
+            cached = self._cache[dt] = (version, data_storage.retrieve_df())
+        return cached[1]
+
+    def data_version(self, dt: Literal['futures', 'stocks']) -> int:
+        return self._storage(dt).version()
 
     async def update_data(self, dt: Literal['futures', 'stocks'], data):
         if not data.is_updated():
             df = await DATA_FETCHERS[dt]()
             df = df[
                 (df['real_exchange'] == RealExchange.REAL_EXCHANGE_MOEX)
-                | (df['ticker'] == 'IMOEX')
-                | (df['ticker'] == 'RTSI')
+                | df['ticker'].isin(INDEX_TICKERS)
             ]
             if dt == 'futures':
                 df = self._apply_futures_filters(df)
@@ -60,10 +78,11 @@ class THandler:
             data.store_df(df)
 
     def _apply_futures_filters(self, df: pd.DataFrame) -> pd.DataFrame:
-        now = datetime.datetime.now().date()
         # df.to_csv('test_futures.csv', index=False)
-        df['expiration_date'] = pd.to_datetime(df['expiration_date']).dt.date
-        df = df[df['expiration_date'] > now + datetime.timedelta(days=3)]
+        df['expiration_date'] = (
+            pd.to_datetime(df['expiration_date'], utc=True).dt.tz_convert(MOSCOW_TZ).dt.date
+        )
+        df = df[moex_calendar.days_to(df['expiration_date']) > 3]
         df = df[
             (df['asset_type'] == 'TYPE_SECURITY')
             | ((df['asset_type'] == 'TYPE_INDEX') & df['name'].str.contains('(мини)', na=False))
@@ -71,13 +90,6 @@ class THandler:
         return df
 
 
-class IndexCounter:
-    async def run(self):
-        index_futures = await get_index_futures()
-        index_futures['current_prices'] = await get_last_prices(index_futures['uid'])
-        return index_futures
-
-
 class DividendCounter:
     def __init__(self, storage, ticker: str = '') -> None:
         self._ticker = ticker.upper()
@@ -86,12 +98,69 @@ class DividendCounter:
         self._stock = self._futures = pd.DataFrame()
         self._handler = THandler(storage)
 
+    @property
+    def price_version(self) -> int:
+        """Меняется вместе с ценами, справочниками, датой расчёта и ставкой."""
+        return hash((
+            moex_calendar.today(),
+            DISCOUNT_RATE,
+            # маржа и размер лота берутся из справочников
+            self._handler.data_version('stocks'),
+            self._handler.data_version('futures'),
+            self._normalized_prices(self._stock['price']),
+            self._normalized_prices(self._futures['price']),
+        ))
+
+    @staticmethod
+    def _normalized_prices(prices: pd.Series) -> tuple:
+        # NaN не равен сам себе и сделал бы ключ кэша уникальным
+        return tuple(None if pd.isna(p) else round(float(p), 9) for p in prices)
+
     async def count(self) -> tuple[pd.DataFrame, pd.DataFrame]:
         await self._load_data()
         await self._fill_missing_numbers()
         self._count_dividends()
         return self._futures, self._stock
 
+    async def count_batch(self, tickers: list[str]) -> tuple[pd.DataFrame, list[str]]:
+        """Дивиденды по нескольким тикерам за один запрос цен.
+
+        Возвращает фьючерсы всех найденных тикеров и список ненайденных.
+        """
+        await self._update_from_db()
+        tickers = list(dict.fromkeys(t.upper() for t in tickers))
+        # у индексов нет position_uid, NaN в ключе склеился бы с чужими фьючерсами
+        self._stock = self._stocks_db[
+            self._stocks_db['ticker'].isin(tickers) & self._stocks_db['position_uid'].notna()
+        ][['ticker', 'uid', 'position_uid']]
+        self._futures = self._futures_db.dropna(subset=['basic_asset_position_uid']).merge(
+            self._stock.rename(columns={'ticker': 'stock_ticker', 'uid': 'stock_uid'}),
+            left_on='basic_asset_position_uid',
+            right_on='position_uid',
+        )
+        missing = [t for t in tickers if t not in set(self._futures['stock_ticker'])]
+        if self._futures.empty:
+            raise ValidationError(f'Для тикеров {", ".join(tickers)} нет фьючерсов')
+
+        prices = await fetch_last_prices(pd.concat([self._stock['uid'], self._futures['uid']]))
+        price_map = {p.uid: p.price for p in prices}
+        self._stock = self._stock.assign(price=self._stock['uid'].map(price_map))
+        self._futures['price'] = self._futures['uid'].map(price_map)
+        stock_prices = self._futures['stock_uid'].map(price_map).astype(float).to_numpy()
+        future_prices = self._futures['price'].astype(float).to_numpy()
+        days = moex_calendar.days_to(self._futures['expiration_date'])
+        self._futures['days'] = days
+        self._futures['dividend'] = implied_dividend(
+            stock_prices,
+            future_prices,
+            self._futures['basic_asset_size'].to_numpy(dtype=float),
+            days,
+            DISCOUNT_RATE,
+        )
+        self._futures['div_percent'] = 100 * self._futures['dividend'] / stock_prices
+        self._futures = self._futures.sort_values(by=['stock_ticker', 'expiration_date'])
+        return self._futures, missing
+
     async def count_all(self):
         await self._update_from_db()
         self._futures = (
@@ -103,7 +172,7 @@ class DividendCounter:
         stocks_with_futures = self._stocks_db[self._stocks_db['ticker'].isin(stock_tickers)]
         combined_uids = pd.concat([stocks_with_futures, self._futures_db]).reset_index(drop=True)
 
-        futures_prices = await get_last_prices(combined_uids['uid'])
+        futures_prices = await fetch_last_prices(combined_uids['uid'])
         # futures_prices is now a list of AssetPrice(price=Decimal(...), uid='...')
 
         # 2. Create a mapping from uid to price
@@ -120,6 +189,12 @@ class DividendCounter:
         )
         futures_with_prices = combined_uids[len(stocks_with_futures) :]
         futures_with_prices = futures_with_prices[futures_with_prices['price'] > 0].reset_index(drop=True)
+        futures_with_prices['days'] = moex_calendar.days_to(futures_with_prices['expiration_date'])
+        # расчёт и запись xlsx синхронные, в потоке они не блокируют event loop
+        return await asyncio.to_thread(self._write_report, stocks_with_prices, futures_with_prices)
+
+    @staticmethod
+    def _write_report(stocks_with_prices: pd.DataFrame, futures_with_prices: pd.DataFrame) -> io.BytesIO:
         res = []
         for stock in stocks_with_prices.itertuples():
             futures = (
@@ -129,10 +204,13 @@ class DividendCounter:
             )
             if len(futures) < 1:
                 continue
-            futures['days'] = (
-                pd.to_datetime(futures['expiration_date']).dt.date - datetime.datetime.now().date()
-            ).apply(lambda d: d.days)
-            futures['dividend'] = futures.apply(self.count_dividend, axis=1, args=(stock.price,))
+            futures['dividend'] = implied_dividend(
+                float(stock.price),
+                futures['price'].astype(float),
+                futures['basic_asset_size'].to_numpy(dtype=float),
+                futures['days'],
+                DISCOUNT_RATE,
+            )
             for future in futures.itertuples():
                 res.append(
                     {
@@ -146,53 +224,34 @@ class DividendCounter:
                     }
                 )
             result = pd.DataFrame(res)
-        filename = 'result.xlsx'
-        with pd.ExcelWriter(filename) as writer:
+        # в памяти, а не в общем файле: воркеры работают в одном каталоге
+        report = io.BytesIO()
+        with pd.ExcelWriter(report) as writer:
             result.to_excel(writer, sheet_name='Подробно', index=False)
-        return filename
+        report.seek(0)
+        return report
 
     def _count_dividends(self) -> None:
-        stock_price: Decimal = self._stock.iloc[0]['price']
-        self._futures['dividend'] = self._futures.apply(self.count_dividend, axis=1, args=(stock_price,))
-        self._futures['div_percent'] = 100 * self._futures['dividend'] / float(stock_price)
-        fair_prices = self._futures.apply(self.count_fair_spread_price, axis=1, args=(stock_price,))
-        self._futures['sell_margin'] = self._futures.apply(self._sell_spread_margin, axis=1, args=(stock_price,))
-        self._futures['buy_margin'] = self._futures.apply(self._buy_spread_margin, axis=1, args=(stock_price,))
-        self._futures = pd.concat([self._futures, fair_prices], axis=1)
-
-    @staticmethod
-    def _sell_spread_margin(row: pd.Series, stock_price: Decimal) -> int:
-        return int(
-            (stock_price * Decimal(row['basic_asset_size']))
-            # - row['price']
-            + Decimal(row['initial_margin_on_sell'])
-        )
-
-    @staticmethod
-    def _buy_spread_margin(row: pd.Series, stock_price: Decimal) -> int:
-        return int(stock_price * Decimal(row['basic_asset_size']))
-
-    @staticmethod
-    def count_dividend(row: pd.Series, stock_price: Decimal) -> float:
-        daily_discount_rate = Decimal(DISCOUNT_RATE) / Decimal('365') / 100
-        present_value = row['price'] / (1 + daily_discount_rate) ** row['days']
-        dividend = stock_price - (present_value / Decimal(row['basic_asset_size']))
-        return float(dividend / Decimal('0.87'))
-
-    @staticmethod
-    def count_fair_spread_price(row: pd.Series, stock_price: Decimal) -> pd.Series:
-        today_fut_price = stock_price * row['basic_asset_size']
-        daily_discount_rate = Decimal(DISCOUNT_RATE) / Decimal('365') / 100
-        fair_future_price = today_fut_price * (1 + daily_discount_rate) ** row['days']
-        fair_spread_price = fair_future_price - today_fut_price
-        current_spread_price = row['price'] - today_fut_price
-        return pd.Series({'current': float(current_spread_price), 'fair': float(fair_spread_price)})
+        stock_price = float(self._stock.iloc[0]['price'])
+        prices = self._futures['price'].astype(float).to_numpy()
+        sizes = self._futures['basic_asset_size'].to_numpy(dtype=float)
+        days = self._futures['days'].to_numpy()
+        spot_value = stock_price * sizes
+        self._futures['dividend'] = implied_dividend(stock_price, prices, sizes, days, DISCOUNT_RATE)
+        self._futures['div_percent'] = 100 * self._futures['dividend'] / stock_price
+        self._futures['sell_margin'] = (
+            spot_value + self._futures['initial_margin_on_sell'].to_numpy(dtype=float)
+        ).astype(int)
+        self._futures['buy_margin'] = spot_value.astype(int)
+        self._futures['current'] = prices - spot_value
+        self._futures['fair'] = fair_price(stock_price, sizes, days, DISCOUNT_RATE) - spot_value
 
     async def _fill_missing_numbers(self) -> None:
-        self._futures['days'] = (
-            pd.to_datetime(self._futures['expiration_date']).dt.date - datetime.datetime.now().date()
-        ).apply(lambda d: d.days)
+        self._futures['days'] = moex_calendar.days_to(self._futures['expiration_date'])
+        self._futures['trading_days'] = moex_calendar.trading_days_to(self._futures['expiration_date'])
         stock_price = await self._get_stock_buy_price()
+        if not stock_price:
+            raise ValidationError(f'Нет цены для тикера {self._ticker}')
         self._stock['price'] = stock_price[0].price
         futures_prices = await self._get_futures_sell_prices()
         price_map = {fp.uid: fp.price for fp in futures_prices}
@@ -200,14 +259,14 @@ class DividendCounter:
 
     async def _get_futures_sell_prices(self):
         if FORCE_LAST_PRICE or not await is_trading_now(self._futures.iloc[0]):
-            return await get_last_prices(self._futures['uid'])
+            return await fetch_last_prices(self._futures['uid'])
         tasks = [get_orderbook_price(row['uid'], sell=True) for _, row in self._futures.iterrows()]
         results = await asyncio.gather(*tasks)
         return results
 
     async def _get_stock_buy_price(self):
         if FORCE_LAST_PRICE or not await is_trading_now(self._futures.iloc[0]):
-            return await get_last_prices(self._stock['uid'])
+            return await fetch_last_prices(self._stock['uid'])
         return await get_orderbook_price(self._stock.iloc[0]['uid'], sell=False)
 
     async def _load_data(self) -> None:
@@ -238,7 +297,7 @@ class DividendCounter:
 
 async def main():
     c = DividendCounter(STORAGE, 'sber')
-    print(await c.count_all())
+    print(len((await c.count_all()).getbuffer()))
 
 
 if __name__ == '__main__':
@@ -33,8 +33,42 @@ STOCKS_KEEP_COLUMNS = [
     'position_uid'
 ]
 ORDERBOOK_DEPTH = 1
+BATCH_MAX_TICKERS = 20
+INDEX_TICKERS = ['IMOEX', 'RTSI']
+INDEX_CACHE_SECONDS = 5
+MARKET_RATE_INDEX = 'IMOEX'
 DEFAULT_DISCOUNT_RATE = 18
 USER_FIELDS = [
     'id', 'is_admin', 'approved', 'discount_rate', 'force_last_price'
 ]
 DEFAULT_USER_SETTINGS = [False, False, DEFAULT_DISCOUNT_RATE, True]
+
+# multi-process deployment: standalone | coordinator | worker
+DEPLOY_MODE = os.getenv('DEPLOY_MODE', 'standalone')
+SNAPSHOT_DIR = os.getenv('SNAPSHOT_DIR', 'snapshot')
+SNAPSHOT_REFRESH_SECONDS = int(os.getenv('SNAPSHOT_REFRESH_SECONDS', '5'))
+SNAPSHOT_MAX_AGE_SECONDS = int(os.getenv('SNAPSHOT_MAX_AGE_SECONDS', '60'))
+# workers receive updates through a webhook, polling allows only one consumer
+WEBHOOK_URL = os.getenv('WEBHOOK_URL', '')
+WEBHOOK_PATH = os.getenv('WEBHOOK_PATH', '/webhook')
+WEBHOOK_SECRET = os.getenv('WEBHOOK_SECRET', '')
+WEBHOOK_HOST = os.getenv('WEBHOOK_HOST', '0.0.0.0')
+WEBHOOK_PORT = int(os.getenv('WEBHOOK_PORT', '8080'))
+
+# command scheduling: cost in tokens, buckets refill in tokens per second
+COMMAND_COSTS = {'lookup': 1, 'details': 1, 'batch': 3, 'index': 2, 'all': 10}
+USER_BUCKET_CAPACITY = 12
+USER_BUCKET_REFILL = 0.2
+GLOBAL_BUCKET_CAPACITY = 60
+GLOBAL_BUCKET_REFILL = 2
+HEAVY_COMMAND_SLOTS = 1
+BUCKET_SWEEP_SECONDS = 60
+
+# t_api transport: live | record | replay
+TAPI_MODE = os.getenv('TAPI_MODE', 'live')
+TAPI_STORE_DIR = os.getenv('TAPI_STORE_DIR', 'tapi_store')
+TAPI_REPLAY_LATENCY_MS = int(os.getenv('TAPI_REPLAY_LATENCY_MS', '0'))
+
+# trading calendar: MOEX non-trading weekdays as comma-separated ISO dates
+MOEX_HOLIDAYS = [d for d in os.getenv('MOEX_HOLIDAYS', '').split(',') if d]
+CALENDAR_DAYS_AHEAD = 3 * 366
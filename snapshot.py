@@ -0,0 +1,111 @@
+import os
+import time
+from decimal import Decimal
+
+import numpy as np
+import pandas as pd
+
+from exceptions import ValidationError
+from settings import SNAPSHOT_DIR, SNAPSHOT_MAX_AGE_SECONDS
+from t_api import AssetPrice
+
+PRICE_DTYPE = np.dtype([('uid', 'U36'), ('units', 'i8'), ('nano', 'i4')])
+CURRENT_POINTER = 'CURRENT'
+KEEP_VERSIONS = 3
+NANO = 10**9
+
+
+def _snapshot_path(directory: str, version: int) -> str:
+    return os.path.join(directory, f'prices-{version}.npy')
+
+
+def _write_atomic(path: str, write) -> None:
+    tmp_path = f'{path}.{os.getpid()}.tmp'
+    with open(tmp_path, 'wb') as f:
+        write(f)
+    os.replace(tmp_path, path)
+
+
+class SnapshotWriter:
+    """Публикует неизменяемые снапшоты цен для процессов-воркеров."""
+
+    def __init__(self, directory: str = SNAPSHOT_DIR) -> None:
+        self._dir = directory
+        os.makedirs(directory, exist_ok=True)
+
+    def publish(self, prices: list[AssetPrice]) -> int:
+        version = time.time_ns()
+        snapshot = np.empty(len(prices), dtype=PRICE_DTYPE)
+        for i, asset in enumerate(prices):
+            units = int(asset.price)
+            snapshot[i] = (asset.uid, units, int((asset.price - units) * NANO))
+        snapshot.sort(order='uid')
+        _write_atomic(
+            _snapshot_path(self._dir, version),
+            lambda f: np.save(f, snapshot)
+        )
+        _write_atomic(
+            os.path.join(self._dir, CURRENT_POINTER),
+            lambda f: f.write(str(version).encode())
+        )
+        self._remove_old_versions()
+        return version
+
+    def _remove_old_versions(self) -> None:
+        versions = sorted(
+            int(name[len('prices-'):-len('.npy')])
+            for name in os.listdir(self._dir)
+            if name.startswith('prices-') and name.endswith('.npy')
+        )
+        # воркеры, успевшие замапить старый файл, продолжают читать его
+        # и после удаления: inode живёт до закрытия mmap
+        for version in versions[:-KEEP_VERSIONS]:
+            os.remove(_snapshot_path(self._dir, version))
+
+
+class SnapshotReader:
+    """Читает актуальный снапшот цен через mmap без копирования."""
+
+    def __init__(self, directory: str = SNAPSHOT_DIR) -> None:
+        self._dir = directory
+        self._version = 0
+        self._prices = np.empty(0, dtype=PRICE_DTYPE)
+
+    @property
+    def version(self) -> int:
+        self._refresh()
+        return self._version
+
+    def prices(self, uids: pd.Series) -> list[AssetPrice]:
+        self._refresh()
+        age = (time.time_ns() - self._version) / NANO
+        if age > SNAPSHOT_MAX_AGE_SECONDS:
+            raise ValidationError(f'Снапшот цен устарел на {int(age)} с')
+        keys = np.asarray(uids.to_list(), dtype=PRICE_DTYPE['uid'])
+        known = self._prices['uid']
+        positions = np.searchsorted(known, keys).clip(max=max(len(known) - 1, 0))
+        is_known = known[positions] == keys if len(known) else np.zeros(len(keys), dtype=bool)
+        # как get_last_prices: неизвестных uid нет в ответе, и их цена
+        # становится NaN у вызывающего (справочник мог обновиться раньше снапшота)
+        rows = self._prices[positions[is_known]]
+        return [
+            AssetPrice(price=Decimal(int(units)) + Decimal(int(nano)) / NANO, uid=str(uid))
+            for uid, units, nano in zip(rows['uid'], rows['units'], rows['nano'])
+        ]
+
+    def _refresh(self) -> None:
+        try:
+            with open(os.path.join(self._dir, CURRENT_POINTER)) as f:
+                version = int(f.read())
+        except FileNotFoundError:
+            raise ValidationError('Снапшот цен ещё не опубликован')
+        if version != self._version:
+            self._prices = np.load(_snapshot_path(self._dir, version), mmap_mode='r')
+            self._version = version
+
+
+_reader = SnapshotReader()
+
+
+async def get_snapshot_prices(uids: pd.Series) -> list[AssetPrice]:
+    return _reader.prices(uids)
@@ -1,6 +1,8 @@
 import datetime
+import fcntl
 import os
 from abc import ABC, abstractmethod
+from contextlib import contextmanager
 
 import pandas as pd
 
@@ -26,14 +28,35 @@ class Storage(ABC):
     def exists(self) -> bool:
         pass
 
+    @abstractmethod
+    def version(self) -> int:
+        pass
+
+    @abstractmethod
+    def lock(self):
+        pass
+
 
 class FileStorage(Storage):
     def __init__(self, name: str, db_timeout_hours: int = 24) -> None:
         self._filename = name + '.csv'
+        self._lockname = name + '.lock'
         self._db_update_timeout_hours = db_timeout_hours
 
+    @contextmanager
+    def lock(self):
+        """Эксклюзивная блокировка хранилища между процессами."""
+        with open(self._lockname, 'a') as lock_file:
+            fcntl.flock(lock_file, fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                fcntl.flock(lock_file, fcntl.LOCK_UN)
+
     def store_df(self, df: pd.DataFrame) -> None:
-        df.to_csv(self._filename, index=False)
+        tmp_filename = f'{self._filename}.{os.getpid()}.tmp'
+        df.to_csv(tmp_filename, index=False)
+        os.replace(tmp_filename, self._filename)
 
     def retrieve_df(self) -> pd.DataFrame:
         return pd.read_csv(self._filename)
@@ -51,3 +74,8 @@ class FileStorage(Storage):
 
     def exists(self) -> bool:
         return os.path.isfile(self._filename)
+
+    def version(self) -> int:
+        if not self.exists():
+            return 0
+        return os.stat(self._filename).st_mtime_ns
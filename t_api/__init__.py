@@ -1,13 +1,15 @@
+import functools
 from decimal import Decimal
 
 import pandas as pd
 from tinkoff.invest.retrying.aio.client import AsyncRetryingClient
 from tinkoff.invest.schemas import InstrumentIdType as IdType, IndicativesRequest
-from tinkoff.invest.schemas import SecurityTradingStatus as TStatus, GetLastPricesResponse, LastPriceType, MoneyValue
+from tinkoff.invest.schemas import SecurityTradingStatus as TStatus, GetLastPricesResponse, LastPriceType
 from tinkoff.invest.utils import quotation_to_decimal
 from typing import NamedTuple
 
 from settings import ORDERBOOK_DEPTH, RETRY_SETTINGS, TCS_RO_TOKEN
+from t_api import transport
 
 
 class AssetPrice(NamedTuple):
@@ -15,6 +17,18 @@ class AssetPrice(NamedTuple):
     uid: str
 
 
+def transported(func):
+    """Пропускает вызов API через текущий транспорт (live, record, replay)."""
+
+    @functools.wraps(func)
+    async def wrapper(*args, **kwargs):
+        key = transport.request_key(func.__name__, args, kwargs)
+        return await transport.current_transport.call(key, lambda: func(*args, **kwargs))
+
+    return wrapper
+
+
+@transported
 async def fetch_futures() -> pd.DataFrame:
     async with AsyncRetryingClient(TCS_RO_TOKEN, settings=RETRY_SETTINGS) as client:
         response = await client.instruments.futures()
@@ -22,6 +36,7 @@ async def fetch_futures() -> pd.DataFrame:
     return result
 
 
+@transported
 async def fetch_stocks() -> pd.DataFrame:
     async with AsyncRetryingClient(TCS_RO_TOKEN, settings=RETRY_SETTINGS) as client:
         response_shares = await client.instruments.shares()
@@ -32,12 +47,14 @@ async def fetch_stocks() -> pd.DataFrame:
     return result
 
 
+@transported
 async def is_trading_now(future: pd.Series):
     async with AsyncRetryingClient(TCS_RO_TOKEN, settings=RETRY_SETTINGS) as client:
         response = await client.instruments.future_by(id_type=IdType.INSTRUMENT_ID_TYPE_UID, id=future['uid'])
     return response.instrument.trading_status == TStatus.SECURITY_TRADING_STATUS_NORMAL_TRADING
 
 
+@transported
 async def get_last_prices(uids: pd.Series) -> list[AssetPrice]:
     async with AsyncRetryingClient(TCS_RO_TOKEN, settings=RETRY_SETTINGS) as client:
         response: GetLastPricesResponse = await client.market_data.get_last_prices(
@@ -47,15 +64,10 @@ async def get_last_prices(uids: pd.Series) -> list[AssetPrice]:
         return result
 
 
+@transported
 async def get_orderbook_price(uid: str, sell: bool) -> Decimal:
     async with AsyncRetryingClient(TCS_RO_TOKEN, settings=RETRY_SETTINGS) as client:
         ob = await client.market_data.get_order_book(instrument_id=uid, depth=ORDERBOOK_DEPTH)
     result = ob.bids[0] if sell else ob.asks[0]
     return quotation_to_decimal(result.price)
 
-
-async def get_index_futures():
-    async with AsyncRetryingClient(TCS_RO_TOKEN, settings=RETRY_SETTINGS) as client:
-        response = await client.instruments.indicatives(request=IndicativesRequest())
-    all_indexes = pd.DataFrame(response.instruments)
-    return all_indexes[(all_indexes['ticker'] == 'IMOEX') | (all_indexes['ticker'] == 'RTSI')]
@@ -0,0 +1,81 @@
+import asyncio
+import gzip
+import hashlib
+import os
+import pickle
+from typing import Any, Awaitable, Callable
+
+import pandas as pd
+
+from settings import TAPI_MODE, TAPI_REPLAY_LATENCY_MS, TAPI_STORE_DIR
+
+
+class ReplayMissError(Exception):
+    """В локальном хранилище нет записанного ответа на запрос."""
+    pass
+
+
+def request_key(name: str, args: tuple, kwargs: dict) -> str:
+    """Ключ запроса: имя функции и её аргументы."""
+    normalized = [a.to_list() if isinstance(a, pd.Series) else a for a in args]
+    raw = repr((name, normalized, sorted(kwargs.items())))
+    return f'{name}-{hashlib.sha1(raw.encode()).hexdigest()}'
+
+
+class ResponseStore:
+    """Ответы API в виде сжатых pickle-файлов, по файлу на ключ."""
+
+    def __init__(self, directory: str = TAPI_STORE_DIR) -> None:
+        self._dir = directory
+
+    def _path(self, key: str) -> str:
+        return os.path.join(self._dir, f'{key}.pkl.gz')
+
+    def save(self, key: str, response: Any) -> None:
+        os.makedirs(self._dir, exist_ok=True)
+        path = self._path(key)
+        tmp_path = f'{path}.{os.getpid()}.tmp'
+        with gzip.open(tmp_path, 'wb') as f:
+            pickle.dump(response, f, protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(tmp_path, path)
+
+    def load(self, key: str) -> Any:
+        try:
+            with gzip.open(self._path(key), 'rb') as f:
+                return pickle.load(f)
+        except FileNotFoundError:
+            raise ReplayMissError(f'Нет записанного ответа для {key}')
+
+
+class LiveTransport:
+    async def call(self, key: str, fetch: Callable[[], Awaitable]) -> Any:
+        return await fetch()
+
+
+class RecordTransport(LiveTransport):
+    def __init__(self, store: ResponseStore) -> None:
+        self._store = store
+
+    async def call(self, key: str, fetch: Callable[[], Awaitable]) -> Any:
+        response = await fetch()
+        self._store.save(key, response)
+        return response
+
+
+class ReplayTransport(LiveTransport):
+    def __init__(self, store: ResponseStore, latency_ms: int = 0) -> None:
+        self._store = store
+        self._latency = latency_ms / 1000
+
+    async def call(self, key: str, fetch: Callable[[], Awaitable]) -> Any:
+        if self._latency:
+            await asyncio.sleep(self._latency)
+        return self._store.load(key)
+
+
+TRANSPORTS = {
+    'live': lambda: LiveTransport(),
+    'record': lambda: RecordTransport(ResponseStore()),
+    'replay': lambda: ReplayTransport(ResponseStore(), TAPI_REPLAY_LATENCY_MS),
+}
+current_transport = TRANSPORTS[TAPI_MODE]()
@@ -0,0 +1,35 @@
+import asyncio
+import datetime
+
+import numpy as np
+import pandas as pd
+
+import service
+from service import DividendCounter
+from trading_calendar import moex_calendar
+
+EXPIRES = (moex_calendar.today() + datetime.timedelta(days=60)).isoformat()
+
+
+def test_batch_ignores_futures_without_position_uid(memory_storage, fake_prices, monkeypatch):
+    storage = memory_storage(
+        stocks=pd.DataFrame({
+            'ticker': ['SBER', 'IMOEX'],
+            'uid': ['sber', 'imoex'],
+            'position_uid': ['p-sber', np.nan],
+        }),
+        futures=pd.DataFrame({
+            'ticker': ['SRZ6', 'MXZ6', 'SiZ6'],
+            'basic_asset': ['SBER', 'IMOEX', 'USD'],
+            'basic_asset_size': [100, 1, 1000],
+            'expiration_date': [EXPIRES] * 3,
+            'uid': ['sr', 'mx', 'si'],
+            'basic_asset_position_uid': ['p-sber', np.nan, np.nan],
+        }),
+    )
+    monkeypatch.setattr(service, 'fetch_last_prices', fake_prices({'sber': 300, 'sr': 30500}))
+
+    futures, missing = asyncio.run(DividendCounter(storage).count_batch(['sber', 'imoex', 'lkoh']))
+
+    assert futures[['stock_ticker', 'ticker']].values.tolist() == [['SBER', 'SRZ6']]
+    assert missing == ['IMOEX', 'LKOH']
@@ -0,0 +1,46 @@
+from decimal import Decimal
+
+import pandas as pd
+import pytest
+
+from service import THandler
+from t_api import AssetPrice
+
+
+@pytest.fixture
+def memory_storage(monkeypatch):
+    """Хранилище справочников в памяти вместо csv-файлов."""
+    monkeypatch.setattr(THandler, '_cache', {})
+
+    def make(stocks: pd.DataFrame, futures: pd.DataFrame):
+        tables = {'stocks': stocks, 'futures': futures}
+
+        class MemoryStorage:
+            def __init__(self, name: str) -> None:
+                self._name = name
+
+            def is_updated(self) -> bool:
+                return True
+
+            def retrieve_df(self) -> pd.DataFrame:
+                return tables[self._name]
+
+            def version(self) -> int:
+                return 1
+
+        return MemoryStorage
+
+    return make
+
+
+@pytest.fixture
+def fake_prices():
+    """get_last_prices по словарю uid -> цена."""
+
+    def make(prices: dict[str, float]):
+        async def fetch(uids: pd.Series) -> list[AssetPrice]:
+            return [AssetPrice(price=Decimal(prices[uid]), uid=uid) for uid in uids]
+
+        return fetch
+
+    return make
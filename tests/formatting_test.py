@@ -0,0 +1,61 @@
+import pandas as pd
+
+from formatting import cached_table, render_table, split_table
+
+
+def futures_frame() -> pd.DataFrame:
+    return pd.DataFrame({
+        'ticker': ['SRZ4', 'SRH5'],
+        'expiration_date': ['2024-12-20', '2025-03-21'],
+        'days': [30, 120],
+        'dividend': [1.234, 25.5],
+        'div_percent': [0.4, 10.016],
+    })
+
+
+def test_render_table_matches_to_string():
+    futures = futures_frame()
+    expected = futures.rename(columns={
+        'expiration_date': 'expires', 'dividend': 'div', 'div_percent': 'div%'
+    })
+    expected['expires'] = pd.to_datetime(expected['expires']).dt.strftime('%d.%m.%y')
+    with pd.option_context('display.float_format', '{:.2f}'.format):
+        assert render_table(futures, 'short') == expected.to_string(index=False)
+
+
+def test_cached_table_reuses_rendered_body():
+    futures = futures_frame()
+    first = cached_table(futures, 'SBER', 1, 'short')
+    futures['days'] = [0, 0]
+
+    assert cached_table(futures, 'SBER', 1, 'short') is first
+    assert cached_table(futures, 'SBER', 2, 'short') != first
+
+
+def test_render_details_matches_to_string():
+    futures = futures_frame().assign(
+        trading_days=[21, 84],
+        current=[-12.5, float('nan')], fair=[900.714, 2318.66], sell_margin=[33000, 3100], buy_margin=[30000, 3000]
+    )
+    expected = futures.rename(columns={
+        'expiration_date': 'expires',
+        'trading_days': 'tdays',
+        'dividend': 'div',
+        'div_percent': 'div%',
+        'sell_margin': 's_m',
+        'buy_margin': 'b_m',
+    })
+    expected['expires'] = pd.to_datetime(expected['expires']).dt.strftime('%d.%m.%y')
+    columns = ['ticker', 'expires', 'days', 'tdays', 'div', 'div%', 'current', 'fair', 's_m', 'b_m']
+    with pd.option_context('display.float_format', '{:.2f}'.format):
+        assert render_table(futures, 'details') == expected[columns].to_string(index=False)
+
+
+def test_split_table_repeats_header_within_limit():
+    table = render_table(pd.concat([futures_frame()] * 10, ignore_index=True), 'short')
+    header = table.split('\n')[0]
+    chunks = split_table(table, 200)
+
+    assert len(chunks) > 1
+    assert all(len(chunk) <= 200 and chunk.startswith(header) for chunk in chunks)
+    assert sum(chunk.count('\n') for chunk in chunks) == table.count('\n')
@@ -0,0 +1,48 @@
+import asyncio
+import datetime
+
+import numpy as np
+import pandas as pd
+import pytest
+
+import index_futures
+from index_futures import IndexCounter
+from trading_calendar import moex_calendar
+
+EXPIRES = (moex_calendar.today() + datetime.timedelta(days=60)).isoformat()
+
+
+@pytest.fixture
+def counter(memory_storage, fake_prices, monkeypatch):
+    storage = memory_storage(
+        stocks=pd.DataFrame({
+            'ticker': ['IMOEX', 'RTSI', 'USD'],
+            'uid': ['imoex', 'rtsi', 'usd'],
+            'position_uid': [np.nan, np.nan, np.nan],
+        }),
+        futures=pd.DataFrame({
+            'ticker': ['MXZ6', 'RMZ6', 'SiZ6'],
+            'basic_asset': ['IMOEX', 'RTSI', 'USD'],
+            'basic_asset_size': [1, 1, 1000],
+            'expiration_date': [EXPIRES] * 3,
+            'uid': ['mx', 'rts', 'si'],
+            'basic_asset_position_uid': [np.nan, np.nan, np.nan],
+        }),
+    )
+    prices = {'imoex': 3000, 'rtsi': 1000, 'mx': 3060, 'rts': 1020, 'si': 90000, 'usd': 90}
+    monkeypatch.setattr(index_futures, 'fetch_last_prices', fake_prices(prices))
+    monkeypatch.setattr(IndexCounter, '_cached', None)
+    return IndexCounter(storage)
+
+
+def test_futures_are_mapped_to_indexes_by_basic_asset(counter):
+    _, result = asyncio.run(counter.run())
+
+    assert result[['ticker', 'index']].values.tolist() == [['MXZ6', 'IMOEX'], ['RMZ6', 'RTSI']]
+    assert result['basis'].tolist() == [60, 20]
+
+
+def test_market_rate_uses_nearest_imoex_future(counter):
+    rate = asyncio.run(counter.market_rate())
+
+    assert rate == pytest.approx(((3060 / 3000) ** (1 / 60) - 1) * 365 * 100)
@@ -0,0 +1,17 @@
+import numpy as np
+
+from pricing import fair_price, implied_dividend, implied_rate
+
+
+def test_implied_rate_inverts_fair_price():
+    days = np.array([30, 90, 365])
+    fair = fair_price(3000, 1, days, 18)
+
+    assert np.allclose(implied_rate(3000, fair, 1, days), 18)
+
+
+def test_fair_future_implies_no_dividend():
+    days = np.array([30, 90])
+    fair = fair_price(300, 100, days, 18)
+
+    assert np.allclose(implied_dividend(300, fair, 100, days, 18), 0)
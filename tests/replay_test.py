@@ -0,0 +1,41 @@
+import asyncio
+from decimal import Decimal
+
+import pandas as pd
+import pytest
+
+import t_api
+from t_api import AssetPrice, transport
+
+
+@pytest.fixture
+def store(tmp_path):
+    return transport.ResponseStore(str(tmp_path))
+
+
+def test_recorded_response_is_replayed(store, monkeypatch):
+    calls = []
+
+    @t_api.transported
+    async def fetch(uids):
+        calls.append(uids.to_list())
+        return [AssetPrice(price=Decimal('1.5'), uid=uid) for uid in uids]
+
+    uids = pd.Series(['a', 'b'])
+    monkeypatch.setattr(transport, 'current_transport', transport.RecordTransport(store))
+    recorded = asyncio.run(fetch(uids))
+    monkeypatch.setattr(transport, 'current_transport', transport.ReplayTransport(store))
+
+    assert asyncio.run(fetch(uids)) == recorded
+    assert calls == [['a', 'b']]
+
+
+def test_replay_serves_api_functions_offline(store, monkeypatch):
+    uids = pd.Series(['uid-1'])
+    prices = [AssetPrice(price=Decimal('250.1'), uid='uid-1')]
+    store.save(transport.request_key('get_last_prices', (uids,), {}), prices)
+    monkeypatch.setattr(transport, 'current_transport', transport.ReplayTransport(store, latency_ms=1))
+
+    assert asyncio.run(t_api.get_last_prices(uids)) == prices
+    with pytest.raises(transport.ReplayMissError):
+        asyncio.run(t_api.get_last_prices(pd.Series(['uid-2'])))
@@ -0,0 +1,109 @@
+import asyncio
+
+import pytest
+
+import scheduler
+from exceptions import RateLimitError
+from scheduler import CommandScheduler, TokenBucket
+
+
+class Clock:
+    def __init__(self) -> None:
+        self.now = 1000.0
+
+    def __call__(self) -> float:
+        return self.now
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = Clock()
+    monkeypatch.setattr(scheduler.time, 'monotonic', clock)
+    return clock
+
+
+def test_bucket_refills_over_time(clock):
+    bucket = TokenBucket(capacity=10, refill_rate=2)
+    bucket.take(10)
+    assert bucket.wait_time(4) == 2
+
+    clock.now += 1
+    assert bucket.wait_time(4) == 1
+
+    clock.now += 100
+    assert bucket.is_full()
+    assert bucket.wait_time(10) == 0
+
+
+def test_admit_weights_commands_by_cost(clock, monkeypatch):
+    monkeypatch.setattr(scheduler, 'USER_BUCKET_CAPACITY', 10)
+    monkeypatch.setattr(scheduler, 'COMMAND_COSTS', {'lookup': 1, 'all': 10})
+    commands = CommandScheduler()
+    commands.admit(1, 'all')
+
+    with pytest.raises(RateLimitError):
+        commands.admit(1, 'lookup')
+    commands.admit(2, 'lookup')
+
+
+def test_idle_buckets_are_evicted(clock, monkeypatch):
+    monkeypatch.setattr(scheduler, 'BUCKET_SWEEP_SECONDS', 60)
+    commands = CommandScheduler()
+    commands.admit(1, 'lookup')
+
+    clock.now += 3600
+    commands.admit(2, 'lookup')
+    assert list(commands._user_buckets) == [2]
+
+
+def test_duplicate_heavy_requests_share_result():
+    async def run():
+        commands = CommandScheduler()
+        calls, positions = [], []
+
+        async def job():
+            calls.append(1)
+            await asyncio.sleep(0.01)
+            return 'report.xlsx'
+
+        async def on_queued(position):
+            positions.append(position)
+
+        results = await asyncio.gather(
+            *(commands.run_heavy('all', job, on_queued) for _ in range(3))
+        )
+        return results, calls, positions, commands
+
+    results, calls, positions, commands = asyncio.run(run())
+    assert results == ['report.xlsx'] * 3
+    assert len(calls) == 1
+    assert positions == []
+    assert commands._heavy_waiters == 0
+    assert commands._inflight == {}
+
+
+def test_different_heavy_commands_report_queue_position():
+    async def run():
+        commands = CommandScheduler()
+        order, positions = [], []
+
+        def job(name):
+            async def run_job():
+                order.append(name)
+                await asyncio.sleep(0.01)
+                return name
+            return run_job
+
+        async def on_queued(position):
+            positions.append(position)
+
+        results = await asyncio.gather(
+            commands.run_heavy('all', job('all'), on_queued),
+            commands.run_heavy('other', job('other'), on_queued),
+        )
+        return results, order, positions
+
+    results, order, positions = asyncio.run(run())
+    assert results == ['all', 'other']
+    assert order == ['all', 'other']
+    assert positions == [1]
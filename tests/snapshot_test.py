@@ -0,0 +1,44 @@
+from decimal import Decimal
+
+import pandas as pd
+import pytest
+
+from exceptions import ValidationError
+from snapshot import SnapshotReader, SnapshotWriter
+from t_api import AssetPrice
+
+
+def test_snapshot_round_trip(tmp_path):
+    prices = [
+        AssetPrice(price=Decimal('123.45'), uid='b' * 36),
+        AssetPrice(price=Decimal('-0.5'), uid='a'),
+        AssetPrice(price=Decimal('0.000000001'), uid='c'),
+    ]
+    version = SnapshotWriter(str(tmp_path)).publish(prices)
+    reader = SnapshotReader(str(tmp_path))
+
+    assert reader.version == version
+    assert reader.prices(pd.Series(['c', 'a', 'b' * 36])) == [prices[2], prices[1], prices[0]]
+
+
+def test_snapshot_keeps_last_versions(tmp_path):
+    writer = SnapshotWriter(str(tmp_path))
+    for price in range(5):
+        version = writer.publish([AssetPrice(price=Decimal(price), uid='a')])
+
+    reader = SnapshotReader(str(tmp_path))
+    assert reader.version == version
+    assert reader.prices(pd.Series(['a'])) == [AssetPrice(price=Decimal(4), uid='a')]
+    assert len(list(tmp_path.glob('prices-*.npy'))) == 3
+
+
+def test_snapshot_skips_unknown_uid(tmp_path):
+    SnapshotWriter(str(tmp_path)).publish([AssetPrice(price=Decimal(1), uid='a')])
+
+    prices = SnapshotReader(str(tmp_path)).prices(pd.Series(['zz', 'a']))
+    assert prices == [AssetPrice(price=Decimal(1), uid='a')]
+
+
+def test_snapshot_not_published(tmp_path):
+    with pytest.raises(ValidationError):
+        SnapshotReader(str(tmp_path)).prices(pd.Series(['a']))
@@ -0,0 +1,58 @@
+import datetime
+
+import numpy as np
+import pandas as pd
+import pytest
+
+import trading_calendar
+from trading_calendar import TradingCalendar
+
+
+@pytest.fixture
+def calendar(monkeypatch):
+    # пятница
+    monkeypatch.setattr(trading_calendar, 'moscow_today', lambda: datetime.date(2026, 12, 25))
+    return TradingCalendar()
+
+
+def test_days_to_across_month_and_year(calendar):
+    dates = pd.Series(['2026-12-25', '2026-12-31', '2027-01-01', '2027-03-01'])
+
+    assert calendar.days_to(dates).tolist() == [0, 6, 7, 66]
+
+
+def test_days_to_accepts_dates_and_past(calendar):
+    dates = [datetime.date(2026, 12, 24), datetime.date(2026, 10, 1)]
+
+    assert calendar.days_to(dates).tolist() == [-1, -85]
+
+
+def test_trading_days_skip_weekends(calendar):
+    # суббота, воскресенье, понедельник, пятница через неделю
+    dates = pd.Series(['2026-12-26', '2026-12-27', '2026-12-28', '2027-01-01'])
+
+    assert calendar.trading_days_to(dates).tolist() == [0, 0, 1, 5]
+
+
+def test_trading_days_skip_holidays(calendar, monkeypatch):
+    monkeypatch.setattr(trading_calendar, 'MOEX_HOLIDAYS', ['2027-01-01', '2027-01-02'])
+
+    assert calendar.trading_days_to(['2026-12-31', '2027-01-05']).tolist() == [4, 6]
+
+
+def test_table_is_extended_for_far_and_early_dates(calendar):
+    far = np.datetime64('2035-06-01')
+    early = np.datetime64('2020-01-01')
+
+    assert calendar.days_to([far]).tolist() == [(far - np.datetime64('2026-12-25')).astype(int)]
+    assert calendar.days_to([early]).tolist() == [(early - np.datetime64('2026-12-25')).astype(int)]
+    assert calendar.trading_days_to([early]).tolist() == [-np.busday_count(early + 1, '2026-12-26')]
+
+
+def test_missing_dates_become_nan(calendar):
+    from_csv = pd.Series(['2026-12-28', np.nan])
+    from_dates = pd.Series([pd.NaT, datetime.date(2026, 12, 28)])
+
+    assert np.array_equal(calendar.days_to(from_csv), [3, np.nan], equal_nan=True)
+    assert np.array_equal(calendar.trading_days_to(from_dates), [np.nan, 1], equal_nan=True)
+    assert (calendar.days_to(from_csv) > 3).tolist() == [False, False]
@@ -0,0 +1,79 @@
+import datetime
+from zoneinfo import ZoneInfo
+
+import numpy as np
+import pandas as pd
+
+from settings import CALENDAR_DAYS_AHEAD, MOEX_HOLIDAYS
+
+MOSCOW_TZ = ZoneInfo('Europe/Moscow')
+DAYS_BEHIND = 31
+
+
+def moscow_today() -> datetime.date:
+    return datetime.datetime.now(MOSCOW_TZ).date()
+
+
+class TradingCalendar:
+    """Таблица дней по московскому времени: календарные и торговые дни MOEX.
+
+    Строка таблицы соответствует календарному дню от self._start, все
+    расчёты сводятся к поиску индексов дат в этой таблице.
+    """
+
+    def __init__(self) -> None:
+        self._start = np.datetime64('NaT', 'D')
+        self._day_number = np.empty(0, dtype=np.int64)
+        self._trading_number = np.empty(0, dtype=np.int64)
+
+    def _build(self, first: np.datetime64, last: np.datetime64, today: np.datetime64) -> None:
+        self._start = first - DAYS_BEHIND
+        end = max(last, today + CALENDAR_DAYS_AHEAD) + 1
+        dates = np.arange(self._start, end, dtype='datetime64[D]')
+        self._day_number = np.arange(len(dates), dtype=np.int64)
+        # число торговых дней от начала таблицы по дату включительно
+        self._trading_number = np.cumsum(np.is_busday(dates, holidays=MOEX_HOLIDAYS))
+
+    def _rows(self, dates) -> tuple[np.ndarray, np.ndarray, int]:
+        """Строки таблицы для известных дат, маска известных и строка сегодня."""
+        days = pd.to_datetime(
+            pd.Series(np.asarray(dates, dtype=object)), errors='coerce'
+        ).to_numpy(dtype='datetime64[D]')
+        known = ~np.isnat(days)
+        days = days[known]
+        today = np.datetime64(moscow_today(), 'D')
+        first = min(days.min(), today) if days.size else today
+        last = max(days.max(), today) if days.size else today
+        if (
+            np.isnat(self._start)
+            or first < self._start
+            or last - self._start >= len(self._day_number)
+        ):
+            self._build(first, last, today)
+        return (days - self._start).astype(np.int64), known, int((today - self._start).astype(np.int64))
+
+    @staticmethod
+    def _lookup(table: np.ndarray, rows: np.ndarray, known: np.ndarray, today: int) -> np.ndarray:
+        result = table[rows] - table[today]
+        if known.all():
+            return result
+        # дата не указана: NaN, как у пропуска в исходных данных
+        with_missing = np.full(len(known), np.nan)
+        with_missing[known] = result
+        return with_missing
+
+    def today(self) -> datetime.date:
+        return moscow_today()
+
+    def days_to(self, dates) -> np.ndarray:
+        """Календарные дни от сегодняшнего дня по Москве до dates."""
+        # таблица может перестроиться в _rows, поэтому она читается после
+        rows, known, today = self._rows(dates)
+        return self._lookup(self._day_number, rows, known, today)
+
+    def trading_days_to(self, dates) -> np.ndarray:
+        """Торговые дни MOEX после сегодняшнего по dates включительно."""
+        rows, known, today = self._rows(dates)
+        return self._lookup(self._trading_number, rows, known, today)
+
+moex_calendar = TradingCalendar()
@@ -13,21 +13,37 @@ class UserHandler:
         return cls._instance
 
     def __init__(self, storage) -> None:
+        if hasattr(self, '_storage'):
+            # синглтон уже инициализирован, свежесть проверяет _reload
+            return
         self._storage = storage('users')
+        self._version = None
+        self._reload()
+
+    def _reload(self) -> None:
+        """Перечитывает пользователей, если их изменил другой процесс."""
+        version = self._storage.version()
+        if version == self._version:
+            return
         self._users: pd.DataFrame = self._storage.retrieve_df().set_index('id')
         self._users.index.name = 'id'
+        self._version = version
 
     def register_user(self, id_) -> str:
-        if self.is_registered(id_):
-            return
-        self._users.loc[id_] = DEFAULT_USER_SETTINGS
-        self._save_users_snapshot()
+        with self._storage.lock():
+            self._reload()
+            if self.is_registered(id_):
+                return
+            self._users.loc[id_] = DEFAULT_USER_SETTINGS
+            self._save_users_snapshot()
 
     def approve_user(self, id_) -> str:
-        if not self.is_registered(id_):
-            return f'User {id_} is not registered!'
-        self._users.loc[id_, 'approved'] = not self._users.loc[id_, 'approved']
-        self._save_users_snapshot()
+        with self._storage.lock():
+            self._reload()
+            if not self.is_registered(id_):
+                return f'User {id_} is not registered!'
+            self._users.loc[id_, 'approved'] = not self._users.loc[id_, 'approved']
+            self._save_users_snapshot()
         new_status = 'APPROVED' if bool(
             self._users.loc[id_, 'approved']
         ) is True else 'NOT APPROVED'
@@ -35,6 +51,7 @@ class UserHandler:
 
     def _save_users_snapshot(self):
         self._storage.store_df(self._users.reset_index())
+        self._version = self._storage.version()
 
     def change_discount_rate(self, id_, new_rate):
         pass
@@ -43,11 +60,13 @@ class UserHandler:
         pass
 
     def is_admin(self, id_):
+        self._reload()
         return self.is_registered(id_) and bool(
             self._users.loc[id_]['is_admin']
         ) is True
 
     def is_approved(self, id_):
+        self._reload()
         return self.is_registered(id_) and bool(
             self._users.loc[id_]['approved']
         ) is True